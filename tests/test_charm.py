@@ -3,40 +3,54 @@
 
 """Module testing the Legend SDLC Operator."""
 
+import functools
+import inspect
 import json
+import os
 
 from charms.finos_legend_libs.v0 import legend_operator_testing
 from ops import testing as ops_testing
 
 import charm
 
+_CHARM_DIR = os.path.dirname(os.path.dirname(inspect.getfile(charm)))
+
+
+@functools.lru_cache(maxsize=None)
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+_DB_CONN_JSON = json.dumps(
+    {
+        "username": "test_db_user",
+        "password": "test_db_pass",
+        "database": "test_db_name",
+        "uri": "test_db_uri",
+    }
+)
+_GITLAB_CONN_JSON = json.dumps(
+    {
+        "gitlab_host": "gitlab_test_host",
+        "gitlab_port": 7667,
+        "gitlab_scheme": "https",
+        "client_id": "test_client_id",
+        "client_secret": "test_client_secret",
+        "openid_discovery_url": "test_discovery_url",
+        "gitlab_host_cert_b64": "test_gitlab_cert",
+    }
+)
+
 
 class LegendSdlcTestWrapper(charm.LegendSDLCServerCharm):
     @classmethod
     def _get_relations_test_data(cls):
+        # NOTE: callers pop entries from the result, so always return fresh dicts.
         return {
-            cls._get_legend_db_relation_name(): {
-                "legend-db-connection": json.dumps(
-                    {
-                        "username": "test_db_user",
-                        "password": "test_db_pass",
-                        "database": "test_db_name",
-                        "uri": "test_db_uri",
-                    }
-                )
-            },
+            cls._get_legend_db_relation_name(): {"legend-db-connection": _DB_CONN_JSON},
             cls._get_legend_gitlab_relation_name(): {
-                "legend-gitlab-connection": json.dumps(
-                    {
-                        "gitlab_host": "gitlab_test_host",
-                        "gitlab_port": 7667,
-                        "gitlab_scheme": "https",
-                        "client_id": "test_client_id",
-                        "client_secret": "test_client_secret",
-                        "openid_discovery_url": "test_discovery_url",
-                        "gitlab_host_cert_b64": "test_gitlab_cert",
-                    }
-                )
+                "legend-gitlab-connection": _GITLAB_CONN_JSON
             },
         }
 
@@ -45,9 +59,17 @@ class LegendSdlcTestWrapper(charm.LegendSDLCServerCharm):
 
 
 class LegendSdlcTestCase(legend_operator_testing.TestBaseFinosCoreServiceLegendCharm):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(self.harness.cleanup)
+
     @classmethod
     def _set_up_harness(cls):
-        harness = ops_testing.Harness(LegendSdlcTestWrapper)
+        harness = ops_testing.Harness(
+            LegendSdlcTestWrapper,
+            meta=_read(os.path.join(_CHARM_DIR, "metadata.yaml")),
+            config=_read(os.path.join(_CHARM_DIR, "config.yaml")),
+        )
         return harness
 
     def test_get_core_legend_service_configs(self):
@@ -76,27 +98,23 @@ class LegendSdlcTestCase(legend_operator_testing.TestBaseFinosCoreServiceLegendC
 
     def test_get_legend_gitlab_redirect_uris(self):
         self.harness.begin()
-        actual_uris = self.harness.charm._get_legend_gitlab_redirect_uris()
 
-        base_url = "http://%s%s" % (
-            self.harness.charm.app.name,
-            charm.SDLC_INGRESS_ROUTE,
-        )
-        expected_url_api = "%s/auth/callback" % base_url
-        expected_url_pac4j = "%s/pac4j/login/callback" % base_url
-        self.assertEqual([expected_url_api, expected_url_pac4j], actual_uris)
-
-        # Test with enable-tls set.
-        self.harness.update_config({"enable-tls": True})
-        actual_uris = self.harness.charm._get_legend_gitlab_redirect_uris()
-
-        base_url = "https://%s%s" % (
-            self.harness.charm.app.name,
-            charm.SDLC_INGRESS_ROUTE,
-        )
-        expected_url_api = "%s/auth/callback" % base_url
-        expected_url_pac4j = "%s/pac4j/login/callback" % base_url
-        self.assertEqual([expected_url_api, expected_url_pac4j], actual_uris)
+        app_name = self.harness.charm.app.name
+        test_cases = [
+            # Without enable-tls set.
+            ({"enable-tls": False}, "http://%s%s" % (app_name, charm.SDLC_INGRESS_ROUTE)),
+            # With enable-tls set.
+            ({"enable-tls": True}, "https://%s%s" % (app_name, charm.SDLC_INGRESS_ROUTE)),
+        ]
+        for config, base_url in test_cases:
+            with self.subTest(config=config):
+                with self.harness.hooks_disabled():
+                    self.harness.update_config(config)
+                actual_uris = self.harness.charm._get_legend_gitlab_redirect_uris()
+
+                expected_url_api = "%s/auth/callback" % base_url
+                expected_url_pac4j = "%s/pac4j/login/callback" % base_url
+                self.assertEqual([expected_url_api, expected_url_pac4j], actual_uris)
 
     def test_config_changed_update_gitlab_relation(self):
         self._test_update_config_gitlab_relation()
@@ -128,26 +146,32 @@ class LegendSdlcTestCase(legend_operator_testing.TestBaseFinosCoreServiceLegendC
         self._test_upgrade_charm()
 
     def test_get_sdlc_service_url(self):
-        self.harness.set_leader(True)
-        self.harness.begin_with_initial_hooks()
-
-        # Test without external-hostname config.
-        actual_url = self.harness.charm._get_sdlc_service_url()
-
-        expected_url = "http://%s%s" % (self.harness.charm.app.name, charm.APPLICATION_ROOT_PATH)
-        self.assertEqual(expected_url, actual_url)
+        self.harness.begin()
 
-        # Test with external-hostname config.
         hostname = "foo.lish"
-        self.harness.update_config({"external-hostname": hostname})
-        actual_url = self.harness.charm._get_sdlc_service_url()
-
-        expected_url = "http://%s%s" % (hostname, charm.APPLICATION_ROOT_PATH)
-        self.assertEqual(expected_url, actual_url)
-
-        # Test with enable-tls set.
-        self.harness.update_config({"enable-tls": True})
-        actual_url = self.harness.charm._get_sdlc_service_url()
-
-        expected_url = "https://%s%s" % (hostname, charm.APPLICATION_ROOT_PATH)
-        self.assertEqual(expected_url, actual_url)
+        app_name = self.harness.charm.app.name
+        test_cases = [
+            # Without external-hostname config.
+            (
+                {"external-hostname": "", "enable-tls": False},
+                "http://%s%s" % (app_name, charm.APPLICATION_ROOT_PATH),
+            ),
+            # With external-hostname config.
+            (
+                {"external-hostname": hostname, "enable-tls": False},
+                "http://%s%s" % (hostname, charm.APPLICATION_ROOT_PATH),
+            ),
+            # With enable-tls set.
+            (
+                {"external-hostname": hostname, "enable-tls": True},
+                "https://%s%s" % (hostname, charm.APPLICATION_ROOT_PATH),
+            ),
+        ]
+        for config, expected_url in test_cases:
+            with self.subTest(config=config):
+                # The URL is derived purely from the config, so there is no
+                # need to run the config-changed hook for every variant.
+                with self.harness.hooks_disabled():
+                    self.harness.update_config(config)
+                actual_url = self.harness.charm._get_sdlc_service_url()
+                self.assertEqual(expected_url, actual_url)